@@ -0,0 +1,69 @@
+"""Backfill ISO-string datetimes written by older versions as native BSON dates.
+
+Required before starting a server version that stores native dates: the chat
+history keyset query only compares dates, so pages after the first would skip
+messages whose timestamp is still a string. Stop the backend, then run from the
+backend directory: python migrate_datetimes.py (it is safe to run again).
+"""
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, UpdateOne
+import asyncio
+import os
+from pathlib import Path
+from datetime import datetime, timezone
+
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Collection name -> datetime field stored as a string by older versions
+DATETIME_FIELDS = {
+    "chat_messages": "timestamp",
+    "chat_sessions": "created_at",
+    "status_checks": "timestamp",
+}
+BATCH_SIZE = 1000
+
+
+def parse_iso_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def backfill_collection(collection, field: str) -> int:
+    """Convert every string value of `field` to a date; returns documents updated"""
+    updated = 0
+    batch = []
+    cursor = collection.find({field: {"$type": "string"}}, {"_id": 1, field: 1})
+    async for doc in cursor:
+        try:
+            value = parse_iso_datetime(doc[field])
+        except ValueError:
+            print(f"Skipping {collection.name} {doc['_id']}: unparseable {field} {doc[field]!r}")
+            continue
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {field: value}}))
+        if len(batch) >= BATCH_SIZE:
+            result = await collection.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+    if batch:
+        result = await collection.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+    return updated
+
+
+async def main():
+    client = AsyncMongoClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    try:
+        for collection_name, field in DATETIME_FIELDS.items():
+            updated = await backfill_collection(db[collection_name], field)
+            print(f"{collection_name}.{field}: converted {updated} documents")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,51 +1,111 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Header, Response
 from dotenv import load_dotenv
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, OperationFailure
+import asyncio
 import os
+import re
+import string
+import hashlib
 import logging
+import orjson
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from collections import OrderedDict, deque
 import uuid
 from datetime import datetime, timezone
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncMongoClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', 50)),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', 10)),
+    maxIdleTimeMS=30000,
+    serverSelectionTimeoutMS=5000,
+    connectTimeoutMS=5000,
+    tz_aware=True
+)
 db = client[os.environ['DB_NAME']]
 
-# Create the main app without a prefix
-app = FastAPI()
+class UTCJSONResponse(ORJSONResponse):
+    """ORJSONResponse that writes UTC datetimes with a Z suffix, as Pydantic does"""
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+        )
+
+# Create the main app without a prefix; encode responses with orjson
+app = FastAPI(default_response_class=UTCJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 
+# Random bytes for ids are read in chunks so creating a model does not cost
+# an os.urandom syscall each time. The pool is cleared in forked children so
+# worker processes never hand out the same ids.
+_UUID_POOL_SIZE = 1024
+_UUID_POOL = deque()
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=_UUID_POOL.clear)
+
+def generate_id() -> str:
+    """Return a random (version 4) UUID string"""
+    if not _UUID_POOL:
+        random_bytes = os.urandom(16 * _UUID_POOL_SIZE)
+        _UUID_POOL.extend(random_bytes[i:i + 16] for i in range(0, len(random_bytes), 16))
+    return str(uuid.UUID(bytes=_UUID_POOL.popleft(), version=4))
+
+
+def utc_now() -> datetime:
+    """Current UTC time truncated to milliseconds, the precision BSON dates keep,
+    so a record reads back exactly as it was first returned"""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
 # Define Models
 class StatusCheck(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=generate_id)
     client_name: str
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timestamp: datetime = Field(default_factory=utc_now)
 
 class StatusCheckCreate(BaseModel):
     client_name: str
 
 class ChatMessage(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=generate_id)
     session_id: str
     message: str
     response: str
     model_provider: str
     model_name: str
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timestamp: datetime = Field(default_factory=utc_now)
     is_safe: bool = True
 
+class ChatMessageCursor(BaseModel):
+    after: datetime
+    after_id: str
+
+class ChatMessagePage(BaseModel):
+    items: List[ChatMessage]
+    next: Optional[ChatMessageCursor] = None
+
 class ChatMessageCreate(BaseModel):
     session_id: str
     message: str
@@ -53,66 +113,326 @@ class ChatMessageCreate(BaseModel):
     model_name: str = "gpt-5"
 
 class ChatSession(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=generate_id)
     session_name: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
     total_messages: int = 0
 
 class ChatSessionCreate(BaseModel):
     session_name: str
 
 
-def prepare_for_mongo(data):
-    """Convert datetime objects to ISO strings for MongoDB storage"""
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-    return data
-
-def parse_from_mongo(item):
-    """Convert ISO strings back to datetime objects"""
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if key in ['timestamp', 'created_at'] and isinstance(value, str):
-                try:
-                    item[key] = datetime.fromisoformat(value)
-                except:
-                    pass
-    return item
+UNSAFE_KEYWORDS = [
+    'violence', 'weapon', 'kill', 'death', 'blood', 'war', 'fight',
+    'inappropriate', 'adult', 'mature', 'scary', 'horror', 'fear',
+    'hate', 'racism', 'discrimination', 'bullying', 'mean'
+]
+
+# Replace complex words with simpler alternatives (keys must be lowercase)
+KID_FRIENDLY_REPLACEMENTS = {
+    'artificial intelligence': 'AI (like a smart computer)',
+    'algorithm': 'computer instructions',
+    'machine learning': 'how computers learn',
+    'neural network': 'computer brain',
+    'processing': 'thinking',
+    'generate': 'create',
+    'sophisticated': 'smart',
+    'complexity': 'how hard something is',
+    'analyze': 'look at carefully',
+    'implement': 'make it work'
+}
+
+# One Aho-Corasick automaton finds unsafe keywords and complex words in the
+# same scan. Without pyahocorasick, fall back to compiled regex alternations.
+if ahocorasick is not None:
+    _KIDS_AC = ahocorasick.Automaton()
+    for _keyword in UNSAFE_KEYWORDS:
+        _KIDS_AC.add_word(_keyword, ("unsafe", _keyword, None))
+    for _complex_word, _simple_word in KID_FRIENDLY_REPLACEMENTS.items():
+        _KIDS_AC.add_word(_complex_word, ("replace", _complex_word, _simple_word))
+    _KIDS_AC.make_automaton()
+else:
+    _KIDS_AC = None
+
+_SAFETY_PATTERN = re.compile("|".join(map(re.escape, UNSAFE_KEYWORDS)))
+
+# Longest keys first so overlapping words prefer the longer match. Case is
+# folded for ASCII letters only, like the automaton path, so every match
+# lowercases back to a dictionary key (Unicode folding would match 'ſ' for 's')
+_KID_PATTERN = re.compile(
+    "|".join(re.escape(k) for k in sorted(KID_FRIENDLY_REPLACEMENTS, key=len, reverse=True)),
+    re.IGNORECASE | re.ASCII
+)
+
+# Keywords are ASCII, so only ASCII letters need folding. Translating the UTF-8
+# bytes is a single C pass that keeps every character at the same offset. The
+# one non-ASCII character str.lower() folds to an ASCII letter on its own is
+# U+212A KELVIN SIGN ('k'), so it is folded explicitly. Plain ASCII text skips
+# the encode/decode round trip: str.lower() is faster there and gives the same
+# result.
+_ASCII_LOWER_TABLE = bytes.maketrans(string.ascii_uppercase.encode(), string.ascii_lowercase.encode())
+
+def _ascii_lower(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    lowered = text.encode("utf-8", "surrogatepass").translate(_ASCII_LOWER_TABLE).decode("utf-8", "surrogatepass")
+    if not lowered.isascii():
+        lowered = lowered.replace("\u212a", "k")
+    return lowered
+
+def _has_unsafe_match(matches) -> bool:
+    return any(kind == "unsafe" for _, (kind, _, _) in matches)
 
 def is_content_safe_for_kids(message: str, response: str) -> bool:
     """Basic content safety check for kids aged 8-12"""
-    unsafe_keywords = [
-        'violence', 'weapon', 'kill', 'death', 'blood', 'war', 'fight',
-        'inappropriate', 'adult', 'mature', 'scary', 'horror', 'fear',
-        'hate', 'racism', 'discrimination', 'bullying', 'mean'
-    ]
-    
-    combined_text = (message + " " + response).lower()
-    return not any(keyword in combined_text for keyword in unsafe_keywords)
+    # Keywords contain no spaces, so scanning each part matches the joined text
+    for text in (message, response):
+        lowered = _ascii_lower(text)
+        if _KIDS_AC is not None:
+            if _has_unsafe_match(_KIDS_AC.iter(lowered)):
+                return False
+        elif _SAFETY_PATTERN.search(lowered) is not None:
+            return False
+    return True
 
 def make_kid_friendly(response: str) -> str:
     """Make AI response more suitable for kids aged 8-12"""
-    # Replace complex words with simpler alternatives
-    replacements = {
-        'artificial intelligence': 'AI (like a smart computer)',
-        'algorithm': 'computer instructions',
-        'machine learning': 'how computers learn',
-        'neural network': 'computer brain',
-        'processing': 'thinking',
-        'generate': 'create',
-        'sophisticated': 'smart',
-        'complexity': 'how hard something is',
-        'analyze': 'look at carefully',
-        'implement': 'make it work'
-    }
+    return _KID_PATTERN.sub(lambda m: KID_FRIENDLY_REPLACEMENTS[m.group(0).lower()], response)
+
+def filter_for_kids(message: str, response: str) -> Tuple[str, bool]:
+    """Make a response kid-friendly and check the exchange is safe in one scan.
+
+    Returns (kid_friendly_response, is_safe). Unsafe responses are returned
+    unchanged since callers replace them anyway.
+    """
+    if _KIDS_AC is None:
+        kid_friendly_response = make_kid_friendly(response)
+        if not is_content_safe_for_kids(message, kid_friendly_response):
+            return response, False
+        return kid_friendly_response, True
+    
+    if _has_unsafe_match(_KIDS_AC.iter(_ascii_lower(message))):
+        return response, False
     
-    result = response
-    for complex_word, simple_word in replacements.items():
-        result = result.replace(complex_word, simple_word)
+    lowered = _ascii_lower(response)
+    replacements = []
+    for end, (kind, word, simple_word) in _KIDS_AC.iter(lowered):
+        if kind == "unsafe":
+            return response, False
+        start = end + 1 - len(word)
+        # Only rewrite words spelled in ASCII, as the regex fallback does
+        # (a KELVIN SIGN folds to 'k' for the safety scan but not here)
+        if response[start:end + 1].isascii():
+            replacements.append((start, end + 1, simple_word))
     
-    return result
+    # Apply leftmost-longest, non-overlapping replacements
+    pieces = []
+    position = 0
+    for start, stop, simple_word in sorted(replacements, key=lambda r: (r[0], -r[1])):
+        if start < position:
+            continue
+        pieces.append(response[position:start])
+        pieces.append(simple_word)
+        position = stop
+    pieces.append(response[position:])
+    return "".join(pieces), True
+
+# Kid-friendly system message shared by every chat
+SYSTEM_MESSAGE = """You are a friendly AI teacher helping kids aged 8-12 learn about artificial intelligence and how computers work. 
+        
+        Rules:
+        1. Use simple, fun language that kids can understand
+        2. Keep explanations short and engaging
+        3. Use examples from everyday life (toys, games, school)
+        4. Always be encouraging and positive
+        5. If asked about something not suitable for kids, gently redirect to learning topics
+        6. Make AI concepts sound exciting and magical but also explain them simply
+        7. Use emojis occasionally to make responses fun
+        
+        Remember: You're teaching kids about AI, so make it fun and easy to understand!"""
+
+# Sent instead of the AI response when the exchange fails the safety check
+UNSAFE_REDIRECT_RESPONSE = "Let's talk about something more fun! How about we explore how AI helps create cool games or helps robots move around? 🤖"
+
+# Keep strong references to fire-and-forget tasks until they finish
+_BACKGROUND_TASKS = set()
+
+def run_in_background(coro):
+    """Schedule a coroutine without awaiting it; failures are logged"""
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+def _on_background_task_done(task: asyncio.Task):
+    _BACKGROUND_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task error: {task.exception()!r}")
+
+# Reuse one LlmChat per (session, provider, model) instead of rebuilding the
+# client on every message; least recently used clients are evicted first.
+CHAT_CACHE_MAX_SIZE = 1024
+_CHAT_CACHE: "OrderedDict[Tuple[str, str, str], LlmChat]" = OrderedDict()
+
+def get_llm_chat(api_key: str, session_id: str, model_provider: str, model_name: str) -> LlmChat:
+    """Return the cached LlmChat for a session/model, creating it on first use"""
+    key = (session_id, model_provider, model_name)
+    chat = _CHAT_CACHE.get(key)
+    if chat is not None:
+        _CHAT_CACHE.move_to_end(key)
+        return chat
+
+    chat = LlmChat(
+        api_key=api_key,
+        session_id=session_id,
+        system_message=SYSTEM_MESSAGE
+    ).with_model(model_provider, model_name)
+    _CHAT_CACHE[key] = chat
+    if len(_CHAT_CACHE) > CHAT_CACHE_MAX_SIZE:
+        _CHAT_CACHE.popitem(last=False)
+    return chat
+
+# Cache raw LLM answers so repeated questions skip the LLM round-trip. Prompts
+# are normalised (case, punctuation, whitespace) before hashing so trivially
+# different phrasings of the same question share an entry. Only the first turn
+# of a session uses the cache: later answers depend on the conversation so far.
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', 30 * 24 * 60 * 60))
+_NON_WORD_PATTERN = re.compile(r"\W+")
+# Part of every key so editing the system message invalidates old answers
+_SYSTEM_MESSAGE_DIGEST = hashlib.sha256(SYSTEM_MESSAGE.encode("utf-8")).hexdigest()
+
+def normalize_prompt(message: str) -> str:
+    """Lowercase a prompt and collapse punctuation/whitespace into single spaces"""
+    return _NON_WORD_PATTERN.sub(" ", message.lower()).strip()
+
+def response_cache_key(model_provider: str, model_name: str, message: str) -> str:
+    """Build the cached_responses key for a prompt sent to a given model"""
+    raw_key = "\0".join([_SYSTEM_MESSAGE_DIGEST, model_provider, model_name, normalize_prompt(message)])
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+# A cached answer never reaches the session's LlmChat, so it is kept here and
+# replayed as context with the session's next message to the LLM
+_UNSEEN_CACHED_TURNS: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+
+async def is_first_turn(session_id: str, model_provider: str, model_name: str) -> bool:
+    """Whether a session has no earlier messages, so its answer is context-free"""
+    if (session_id, model_provider, model_name) in _CHAT_CACHE or session_id in _UNSEEN_CACHED_TURNS:
+        return False
+    return await db.chat_messages.find_one({"session_id": session_id}, {"_id": 1}) is None
+
+def remember_cached_turn(session_id: str, message: str, response: str):
+    _UNSEEN_CACHED_TURNS[session_id] = (message, response)
+    if len(_UNSEEN_CACHED_TURNS) > CHAT_CACHE_MAX_SIZE:
+        _UNSEEN_CACHED_TURNS.popitem(last=False)
+
+def with_unseen_cached_turn(session_id: str, message: str) -> str:
+    """Prefix a message with the session's cached exchange the LLM has not seen"""
+    earlier = _UNSEEN_CACHED_TURNS.get(session_id)
+    if earlier is None:
+        return message
+    earlier_message, earlier_response = earlier
+    return (
+        f"(Earlier in this chat the kid asked: {earlier_message}\n"
+        f"You answered: {earlier_response})\n\n{message}"
+    )
+
+async def get_cached_response(key: str) -> Optional[str]:
+    """Return the cached raw LLM response for a key, if any"""
+    cached = await db.cached_responses.find_one({"key": key}, {"_id": 0, "response": 1})
+    return cached["response"] if cached else None
+
+async def store_cached_response(key: str, input: ChatMessageCreate, response: str):
+    """Store a raw LLM response; created_at drives the TTL index"""
+    await db.cached_responses.update_one(
+        {"key": key},
+        {"$set": {
+            "key": key,
+            "prompt": input.message,
+            "response": response,
+            "model_provider": input.model_provider,
+            "model_name": input.model_name,
+            "created_at": datetime.now(timezone.utc)
+        }},
+        upsert=True
+    )
+
+# Status checks are buffered in memory and written in batches with insert_many.
+# A check is acknowledged before it is stored: checks that hit a transient error
+# (Mongo unreachable, write concern not met) are put back and retried on the
+# next flush, while checks Mongo rejects outright are logged and dropped so they
+# cannot block the rest. Anything still buffered when the process exits (crash,
+# or shutdown while Mongo is unreachable) is lost, and GET /status can lag POST
+# by one flush interval. The buffer is capped; once full, POST writes the check
+# directly and fails if Mongo does.
+STATUS_FLUSH_INTERVAL_SECONDS = 0.25
+STATUS_FLUSH_BATCH_SIZE = 100
+STATUS_BUFFER_MAX_SIZE = 10000
+DUPLICATE_KEY_ERROR_CODE = 11000
+INDEX_OPTIONS_CONFLICT_ERROR_CODE = 85
+_STATUS_BUFFER: List[dict] = []
+_STATUS_FLUSH_NEEDED = asyncio.Event()
+_status_flush_task: Optional[asyncio.Task] = None
+
+async def insert_status_checks_one_by_one(batch: List[dict]) -> List[dict]:
+    """Write each check on its own; returns the checks that hit a transient error"""
+    results = await asyncio.gather(
+        *(db.status_checks.insert_one(status_data) for status_data in batch),
+        return_exceptions=True
+    )
+    retry = []
+    for status_data, result in zip(batch, results):
+        if not isinstance(result, Exception) or isinstance(result, DuplicateKeyError):
+            continue
+        if isinstance(result, ConnectionFailure):
+            retry.append(status_data)
+        else:
+            logger.error(f"Dropping status check {status_data.get('id')}: {str(result)}")
+    return retry
+
+async def flush_status_buffer():
+    """Write all buffered status checks; ones that hit a transient error go back in the buffer"""
+    if not _STATUS_BUFFER:
+        return
+    batch = _STATUS_BUFFER[:]
+    _STATUS_BUFFER.clear()
+    try:
+        await db.status_checks.insert_many(batch, ordered=False)
+        return
+    except ConnectionFailure as e:
+        retry, error = batch, e
+    except BulkWriteError as e:
+        # insert_many assigned every _id, so checks stored by an earlier attempt
+        # fail as duplicates and count as written
+        write_errors = {
+            write_error["index"]: write_error for write_error in e.details.get("writeErrors", [])
+        }
+        for index, write_error in write_errors.items():
+            if write_error.get("code") != DUPLICATE_KEY_ERROR_CODE:
+                logger.error(f"Dropping status check {batch[index].get('id')}: {write_error.get('errmsg')}")
+        # The checks that were written may not be durable yet
+        if e.details.get("writeConcernErrors"):
+            retry = [status_data for index, status_data in enumerate(batch) if index not in write_errors]
+        else:
+            retry = []
+        error = e
+    except Exception as e:
+        # The whole call failed, e.g. one check could not be encoded: write the
+        # checks one by one so only the bad ones are lost
+        retry = await insert_status_checks_one_by_one(batch)
+        error = e
+    if retry:
+        logger.error(f"Failed to write {len(retry)} status checks, retrying next flush: {str(error)}")
+        _STATUS_BUFFER[:0] = retry
+
+async def flush_status_buffer_periodically():
+    while True:
+        try:
+            await asyncio.wait_for(_STATUS_FLUSH_NEEDED.wait(), STATUS_FLUSH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _STATUS_FLUSH_NEEDED.clear()
+        # Shielded and tracked so shutdown waits for an in-flight batch
+        await asyncio.shield(run_in_background(flush_status_buffer()))
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
@@ -123,26 +443,34 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    status_data = prepare_for_mongo(status_obj.dict())
-    _ = await db.status_checks.insert_one(status_data)
+    status_data = status_obj.dict()
+    if len(_STATUS_BUFFER) >= STATUS_BUFFER_MAX_SIZE:
+        # Flushes are falling behind (Mongo slow or down); write this one now
+        await db.status_checks.insert_one(status_data)
+        return status_obj
+    _STATUS_BUFFER.append(status_data)
+    if len(_STATUS_BUFFER) >= STATUS_FLUSH_BATCH_SIZE:
+        _STATUS_FLUSH_NEEDED.set()
     return status_obj
 
+# Read-only list endpoints return the projected documents directly instead of
+# rebuilding models just to serialise them again; response_model documents them
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**parse_from_mongo(status_check)) for status_check in status_checks]
+    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+    return UTCJSONResponse(status_checks)
 
 @api_router.post("/chat/session", response_model=ChatSession)
 async def create_chat_session(input: ChatSessionCreate):
     session_obj = ChatSession(**input.dict())
-    session_data = prepare_for_mongo(session_obj.dict())
+    session_data = session_obj.dict()
     await db.chat_sessions.insert_one(session_data)
     return session_obj
 
 @api_router.get("/chat/sessions", response_model=List[ChatSession])
 async def get_chat_sessions():
-    sessions = await db.chat_sessions.find().to_list(100)
-    return [ChatSession(**parse_from_mongo(session)) for session in sessions]
+    sessions = await db.chat_sessions.find({}, {"_id": 0}).to_list(100)
+    return [ChatSession(**session) for session in sessions]
 
 @api_router.post("/chat/message", response_model=ChatMessage)
 async def send_chat_message(input: ChatMessageCreate):
@@ -152,41 +480,38 @@ async def send_chat_message(input: ChatMessageCreate):
         if not api_key:
             raise HTTPException(status_code=500, detail="API key not configured")
         
-        # Create kid-friendly system message
-        system_message = """You are a friendly AI teacher helping kids aged 8-12 learn about artificial intelligence and how computers work. 
-        
-        Rules:
-        1. Use simple, fun language that kids can understand
-        2. Keep explanations short and engaging
-        3. Use examples from everyday life (toys, games, school)
-        4. Always be encouraging and positive
-        5. If asked about something not suitable for kids, gently redirect to learning topics
-        6. Make AI concepts sound exciting and magical but also explain them simply
-        7. Use emojis occasionally to make responses fun
-        
-        Remember: You're teaching kids about AI, so make it fun and easy to understand!"""
-        
-        # Initialize LLM chat
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=input.session_id,
-            system_message=system_message
-        ).with_model(input.model_provider, input.model_name)
-        
-        # Create user message
-        user_message = UserMessage(text=input.message)
+        # Reuse a cached answer when a session opens with a common question
+        first_turn = await is_first_turn(input.session_id, input.model_provider, input.model_name)
+        ai_response = None
+        if first_turn:
+            cache_key = response_cache_key(input.model_provider, input.model_name, input.message)
+            ai_response = await get_cached_response(cache_key)
+            if ai_response is not None:
+                remember_cached_turn(input.session_id, input.message, ai_response)
         
-        # Get AI response
-        ai_response = await chat.send_message(user_message)
+        if ai_response is None:
+            # Get (or create) the LLM chat for this session and model
+            chat = get_llm_chat(
+                api_key,
+                input.session_id,
+                input.model_provider,
+                input.model_name
+            )
+            
+            # Create user message
+            user_message = UserMessage(text=with_unseen_cached_turn(input.session_id, input.message))
+            
+            # Get AI response
+            ai_response = await chat.send_message(user_message)
+            _UNSEEN_CACHED_TURNS.pop(input.session_id, None)
+            if first_turn:
+                run_in_background(store_cached_response(cache_key, input, ai_response))
         
-        # Make response kid-friendly
-        kid_friendly_response = make_kid_friendly(ai_response)
-        
-        # Check content safety
-        is_safe = is_content_safe_for_kids(input.message, kid_friendly_response)
+        # Make response kid-friendly and check content safety in one pass
+        kid_friendly_response, is_safe = filter_for_kids(input.message, ai_response)
         
         if not is_safe:
-            kid_friendly_response = "Let's talk about something more fun! How about we explore how AI helps create cool games or helps robots move around? 🤖"
+            kid_friendly_response = UNSAFE_REDIRECT_RESPONSE
         
         # Create chat message object
         chat_message = ChatMessage(
@@ -198,15 +523,15 @@ async def send_chat_message(input: ChatMessageCreate):
             is_safe=is_safe
         )
         
-        # Save to database
-        message_data = prepare_for_mongo(chat_message.dict())
+        # Save to database; the message is stored before we respond
+        message_data = chat_message.dict()
         await db.chat_messages.insert_one(message_data)
         
-        # Update session message count
-        await db.chat_sessions.update_one(
+        # Update session message count without holding up the response
+        run_in_background(db.chat_sessions.update_one(
             {"id": input.session_id},
             {"$inc": {"total_messages": 1}}
-        )
+        ))
         
         return chat_message
         
@@ -214,50 +539,94 @@ async def send_chat_message(input: ChatMessageCreate):
         logger.error(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process chat message: {str(e)}")
 
-@api_router.get("/chat/messages/{session_id}", response_model=List[ChatMessage])
-async def get_chat_messages(session_id: str):
-    messages = await db.chat_messages.find({"session_id": session_id}).sort("timestamp", 1).to_list(1000)
-    return [ChatMessage(**parse_from_mongo(message)) for message in messages]
+CHAT_MESSAGE_PROJECTION = {
+    "_id": 0, "id": 1, "session_id": 1, "message": 1, "response": 1,
+    "timestamp": 1, "is_safe": 1, "model_provider": 1, "model_name": 1
+}
 
-@api_router.get("/models")
-async def get_available_models():
-    return {
-        "models": [
-            {
-                "provider": "openai",
-                "name": "gpt-5",
-                "display_name": "GPT-5 (Super Smart)",
-                "description": "The newest and smartest AI that can help with almost anything!",
-                "kid_friendly_description": "Like having a really smart friend who knows lots of cool facts! 🧠"
-            },
-            {
-                "provider": "anthropic", 
-                "name": "claude-4-sonnet-20250514",
-                "display_name": "Claude 4 (Creative Helper)",
-                "description": "Great at creative writing and explaining things in fun ways!",
-                "kid_friendly_description": "Loves to tell stories and explain things with fun examples! 📚"
-            },
-            {
-                "provider": "gemini",
-                "name": "gemini-2.5-pro", 
-                "display_name": "Gemini 2.5 (Multi-Talented)",
-                "description": "Can do many different things and is great at problem-solving!",
-                "kid_friendly_description": "Like a super helper that can do lots of different tasks! ⭐"
-            }
+@api_router.get("/chat/messages/{session_id}", response_model=ChatMessagePage)
+async def get_chat_messages(
+    session_id: str,
+    after: Optional[datetime] = None,
+    after_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Page through a session's messages oldest first; pass the fields of `next`
+    back as query parameters to get the following page"""
+    query = {"session_id": session_id}
+    if after is not None and after_id is not None:
+        # Timestamps are only millisecond-precise, so ties are broken by id
+        query["$or"] = [
+            {"timestamp": {"$gt": after}},
+            {"timestamp": after, "id": {"$gt": after_id}}
         ]
-    }
+    elif after is not None:
+        query["timestamp"] = {"$gt": after}
+    
+    messages = await db.chat_messages.find(query, CHAT_MESSAGE_PROJECTION).sort(
+        [("timestamp", 1), ("id", 1)]
+    ).limit(limit).to_list(limit)
+    next_cursor = None
+    if len(messages) == limit:
+        next_cursor = {"after": messages[-1]["timestamp"], "after_id": messages[-1]["id"]}
+    return UTCJSONResponse({"items": messages, "next": next_cursor})
 
-# Include the router in the main app
-app.include_router(api_router)
+# The model list is static: serialise it once and let clients revalidate
+AVAILABLE_MODELS = {
+    "models": [
+        {
+            "provider": "openai",
+            "name": "gpt-5",
+            "display_name": "GPT-5 (Super Smart)",
+            "description": "The newest and smartest AI that can help with almost anything!",
+            "kid_friendly_description": "Like having a really smart friend who knows lots of cool facts! 🧠"
+        },
+        {
+            "provider": "anthropic", 
+            "name": "claude-4-sonnet-20250514",
+            "display_name": "Claude 4 (Creative Helper)",
+            "description": "Great at creative writing and explaining things in fun ways!",
+            "kid_friendly_description": "Loves to tell stories and explain things with fun examples! 📚"
+        },
+        {
+            "provider": "gemini",
+            "name": "gemini-2.5-pro", 
+            "display_name": "Gemini 2.5 (Multi-Talented)",
+            "description": "Can do many different things and is great at problem-solving!",
+            "kid_friendly_description": "Like a super helper that can do lots of different tasks! ⭐"
+        }
+    ]
+}
+_MODELS_JSON = orjson.dumps(AVAILABLE_MODELS)
+_MODELS_ETAG = f'"{hashlib.sha256(_MODELS_JSON).hexdigest()[:32]}"'
+_MODELS_HEADERS = {"ETag": _MODELS_ETAG, "Cache-Control": "public, max-age=3600"}
+
+@api_router.get("/models")
+async def get_available_models(if_none_match: Optional[str] = Header(None)):
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or _MODELS_ETAG in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=_MODELS_HEADERS)
+    return Response(content=_MODELS_JSON, media_type="application/json", headers=_MODELS_HEADERS)
+
+# Credentials are only allowed for an explicit origin list; with "*" the
+# middleware can send a constant Access-Control-Allow-Origin header
+CORS_ORIGINS = tuple(
+    origin.strip() for origin in os.environ.get('CORS_ORIGINS', '*').split(',') if origin.strip()
+)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+    allow_credentials="*" not in CORS_ORIGINS,
+    allow_origins=CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Include the router in the main app
+app.include_router(api_router)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -265,6 +634,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def warm_up_db_client():
+    # Connect before serving so the first request does not pay the handshake
+    await db.command("ping")
+
+@app.on_event("startup")
+async def create_indexes():
+    # Serve per-session history as an index range scan with no in-memory sort
+    await db.chat_messages.create_index([("session_id", 1), ("timestamp", 1), ("id", 1)])
+    await db.chat_sessions.create_index([("id", 1)], unique=True)
+    await db.status_checks.create_index([("timestamp", -1)])
+    await db.cached_responses.create_index([("key", 1)], unique=True)
+    try:
+        await db.cached_responses.create_index(
+            [("created_at", 1)],
+            expireAfterSeconds=RESPONSE_CACHE_TTL_SECONDS
+        )
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT_ERROR_CODE:
+            raise
+        # The TTL index exists with an older RESPONSE_CACHE_TTL_SECONDS; update it in place
+        await db.command(
+            "collMod", "cached_responses",
+            index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": RESPONSE_CACHE_TTL_SECONDS}
+        )
+
+@app.on_event("startup")
+async def start_status_flusher():
+    global _status_flush_task
+    _status_flush_task = asyncio.create_task(flush_status_buffer_periodically())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    # Stop the status flusher
+    if _status_flush_task is not None:
+        _status_flush_task.cancel()
+        await asyncio.gather(_status_flush_task, return_exceptions=True)
+    
+    # Let pending background writes (including an in-flight status batch)
+    # finish, then write whatever status checks are still buffered
+    if _BACKGROUND_TASKS:
+        await asyncio.gather(*_BACKGROUND_TASKS, return_exceptions=True)
+    await flush_status_buffer()
+    if _STATUS_BUFFER:
+        logger.error(f"Dropping {len(_STATUS_BUFFER)} unwritten status checks at shutdown")
+    await client.close()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Same as `uvicorn server:app --loop uvloop --http httptools --workers N`
+    uvicorn.run(
+        "server:app",
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 8001)),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get('WEB_CONCURRENCY', 1))
+    )
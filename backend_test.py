@@ -1,4 +1,5 @@
-import requests
+import aiohttp
+import asyncio
 import sys
 import json
 from datetime import datetime
@@ -8,12 +9,14 @@ class AILearningPlatformTester:
     def __init__(self, base_url="https://genaiforyouth.preview.emergentagent.com/api"):
         self.base_url = base_url
         self.session_id = None
+        self.http = None
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
 
-    def log_test(self, name, success, details=""):
-        """Log test result"""
+    def log_test(self, name, success, details="", header=""):
+        """Log test result; all of its output is printed in one call so that
+        concurrently running tests do not interleave their lines"""
         self.tests_run += 1
         if success:
             self.tests_passed += 1
@@ -27,59 +30,59 @@ class AILearningPlatformTester:
         self.test_results.append(result)
         
         status = "✅ PASSED" if success else "❌ FAILED"
-        print(f"\n{status} - {name}")
+        output = f"{header}\n{status} - {name}"
         if details:
-            print(f"   Details: {details}")
+            output += f"\n   Details: {details}"
+        print(output)
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, timeout=30):
+    async def run_test(self, name, method, endpoint, expected_status, data=None, timeout=30):
         """Run a single API test"""
         url = f"{self.base_url}/{endpoint}"
         headers = {'Content-Type': 'application/json'}
 
-        print(f"\n🔍 Testing {name}...")
-        print(f"   URL: {url}")
+        header = f"\n🔍 Testing {name}...\n   URL: {url}"
         
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=timeout)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers, timeout=timeout)
+            async with self.http.request(
+                method, url, json=data, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                response_text = await response.text()
 
-            success = response.status_code == expected_status
+            success = response.status == expected_status
             
             if success:
                 try:
-                    response_data = response.json()
-                    details = f"Status: {response.status_code}, Response: {json.dumps(response_data, indent=2)[:200]}..."
+                    response_data = json.loads(response_text)
+                    details = f"Status: {response.status}, Response: {json.dumps(response_data, indent=2)[:200]}..."
                 except:
-                    details = f"Status: {response.status_code}, Response: {response.text[:200]}..."
+                    details = f"Status: {response.status}, Response: {response_text[:200]}..."
             else:
-                details = f"Expected {expected_status}, got {response.status_code}. Response: {response.text[:200]}..."
+                details = f"Expected {expected_status}, got {response.status}. Response: {response_text[:200]}..."
 
-            self.log_test(name, success, details)
-            return success, response.json() if success and response.text else {}
+            self.log_test(name, success, details, header)
+            return success, json.loads(response_text) if success and response_text else {}
 
-        except requests.exceptions.Timeout:
+        except asyncio.TimeoutError:
             details = f"Request timed out after {timeout} seconds"
-            self.log_test(name, False, details)
+            self.log_test(name, False, details, header)
             return False, {}
         except Exception as e:
             details = f"Error: {str(e)}"
-            self.log_test(name, False, details)
+            self.log_test(name, False, details, header)
             return False, {}
 
-    def test_root_endpoint(self):
+    async def test_root_endpoint(self):
         """Test root API endpoint"""
-        return self.run_test(
+        return await self.run_test(
             "Root API Endpoint",
             "GET",
             "",
             200
         )
 
-    def test_get_models(self):
+    async def test_get_models(self):
         """Test getting available AI models"""
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Get Available Models",
             "GET", 
             "models",
@@ -100,13 +103,13 @@ class AILearningPlatformTester:
         
         return success, response
 
-    def test_create_session(self):
-        """Test creating a new chat session"""
+    async def test_create_session(self, label="Test Session"):
+        """Test creating a new chat session; returns its id, or None on failure"""
         session_data = {
-            "session_name": f"Test Session - {datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            "session_name": f"{label} - {datetime.now().strftime('%Y%m%d_%H%M%S')}"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create Chat Session",
             "POST",
             "chat/session",
@@ -115,27 +118,27 @@ class AILearningPlatformTester:
         )
         
         if success and 'id' in response:
-            self.session_id = response['id']
-            self.log_test("Session ID Retrieved", True, f"Session ID: {self.session_id}")
-        else:
-            self.log_test("Session ID Retrieved", False, "No session ID in response")
+            self.log_test("Session ID Retrieved", True, f"Session ID: {response['id']}")
+            return response['id']
         
-        return success, response
+        self.log_test("Session ID Retrieved", False, "No session ID in response")
+        return None
 
-    def test_send_message(self, message, model_provider="openai", model_name="gpt-5"):
-        """Test sending a chat message"""
-        if not self.session_id:
+    async def test_send_message(self, message, model_provider="openai", model_name="gpt-5", session_id=None):
+        """Test sending a chat message (to the main test session by default)"""
+        session_id = session_id or self.session_id
+        if not session_id:
             self.log_test("Send Message - No Session", False, "No session ID available")
             return False, {}
         
         message_data = {
-            "session_id": self.session_id,
+            "session_id": session_id,
             "message": message,
             "model_provider": model_provider,
             "model_name": model_name
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Send Message ({model_provider}/{model_name})",
             "POST",
             "chat/message",
@@ -163,38 +166,39 @@ class AILearningPlatformTester:
         
         return success, response
 
-    def test_get_messages(self):
+    async def test_get_messages(self):
         """Test retrieving chat messages for a session"""
         if not self.session_id:
             self.log_test("Get Messages - No Session", False, "No session ID available")
             return False, {}
         
-        return self.run_test(
+        return await self.run_test(
             "Get Chat Messages",
             "GET",
             f"chat/messages/{self.session_id}",
             200
         )
 
-    def test_get_sessions(self):
+    async def test_get_sessions(self):
         """Test retrieving all chat sessions"""
-        return self.run_test(
+        return await self.run_test(
             "Get Chat Sessions",
             "GET",
             "chat/sessions",
             200
         )
 
-    def test_safety_filtering(self):
+    async def test_safety_filtering(self):
         """Test safety filtering with inappropriate content"""
-        if not self.session_id:
-            # Create a session first
-            self.test_create_session()
+        # Use a session of its own so concurrent tests do not share a conversation
+        session_id = await self.test_create_session("Safety Test")
+        if not session_id:
+            return
         
         # Test with potentially unsafe content
         unsafe_message = "Tell me about violence and weapons"
         
-        success, response = self.test_send_message(unsafe_message)
+        success, response = await self.test_send_message(unsafe_message, session_id=session_id)
         
         if success:
             # Check if safety filtering worked
@@ -204,15 +208,16 @@ class AILearningPlatformTester:
             else:
                 self.log_test("Safety Filtering Active", False, f"Response may contain unsafe content: {response_text[:100]}...")
 
-    def test_kid_friendly_language(self):
+    async def test_kid_friendly_language(self):
         """Test kid-friendly language simplification"""
-        if not self.session_id:
-            self.test_create_session()
+        session_id = await self.test_create_session("Kid-Friendly Test")
+        if not session_id:
+            return
         
         # Test with complex AI terminology
         complex_message = "Explain artificial intelligence and machine learning algorithms"
         
-        success, response = self.test_send_message(complex_message)
+        success, response = await self.test_send_message(complex_message, session_id=session_id)
         
         if success:
             response_text = response.get('response', '').lower()
@@ -224,11 +229,8 @@ class AILearningPlatformTester:
             else:
                 self.log_test("Kid-Friendly Language", False, f"Response may be too complex: {response_text[:100]}...")
 
-    def test_multiple_models(self):
+    async def test_multiple_models(self):
         """Test different AI models"""
-        if not self.session_id:
-            self.test_create_session()
-        
         models_to_test = [
             ("openai", "gpt-5"),
             ("anthropic", "claude-4-sonnet-20250514"),
@@ -237,37 +239,54 @@ class AILearningPlatformTester:
         
         test_message = "What is AI?"
         
-        for provider, model in models_to_test:
-            success, response = self.test_send_message(test_message, provider, model)
+        # The models are independent, so wait on all of them at once, each in
+        # its own session
+        async def test_model(provider, model):
+            session_id = await self.test_create_session(f"Model Test {provider}/{model}")
+            if not session_id:
+                return False, {}
+            return await self.test_send_message(test_message, provider, model, session_id=session_id)
+        
+        results = await asyncio.gather(*[
+            test_model(provider, model)
+            for provider, model in models_to_test
+        ])
+        
+        for (provider, model), (success, response) in zip(models_to_test, results):
             if success:
                 self.log_test(f"Model {provider}/{model} Working", True, "Model responded successfully")
             else:
                 self.log_test(f"Model {provider}/{model} Working", False, "Model failed to respond")
 
-    def run_all_tests(self):
-        """Run comprehensive test suite"""
+    async def run_all_tests(self):
+        """Run comprehensive test suite, overlapping tests that do not depend on each other"""
         print("🚀 Starting AI Learning Platform Backend Tests")
         print(f"Testing against: {self.base_url}")
         print("=" * 60)
         
-        # Basic connectivity tests
-        self.test_root_endpoint()
-        self.test_get_models()
-        
-        # Session management tests
-        self.test_create_session()
-        self.test_get_sessions()
-        
-        # Basic messaging test
-        self.test_send_message("Hello! What is AI?")
-        self.test_get_messages()
-        
-        # Safety and kid-friendly tests
-        self.test_safety_filtering()
-        self.test_kid_friendly_language()
-        
-        # Multiple model tests
-        self.test_multiple_models()
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=20)) as self.http:
+            # Basic connectivity tests
+            await asyncio.gather(
+                self.test_root_endpoint(),
+                self.test_get_models()
+            )
+            
+            # Session management tests
+            self.session_id = await self.test_create_session()
+            
+            # Basic messaging test (runs alongside listing sessions)
+            await asyncio.gather(
+                self.test_get_sessions(),
+                self.test_send_message("Hello! What is AI?")
+            )
+            await self.test_get_messages()
+            
+            # Safety, kid-friendly and multiple model tests (each uses its own sessions)
+            await asyncio.gather(
+                self.test_safety_filtering(),
+                self.test_kid_friendly_language(),
+                self.test_multiple_models()
+            )
         
         # Print final results
         print("\n" + "=" * 60)
@@ -285,7 +304,7 @@ class AILearningPlatformTester:
 
 def main():
     tester = AILearningPlatformTester()
-    return tester.run_all_tests()
+    return asyncio.run(tester.run_all_tests())
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self.docs = self.docs[:limit]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    """Just enough of a Mongo collection for the chat history query"""
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        fields = [field for field, included in projection.items() if included]
+        return FakeCursor([
+            {field: doc[field] for field in fields}
+            for doc in self.docs if matches(doc, query)
+        ])
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, alternative) for alternative in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not doc[field] > condition["$gt"]:
+                return False
+        elif doc[field] != condition:
+            return False
+    return True
+
+
+T0 = datetime(2026, 1, 1, 12, 0, 0, 123000, tzinfo=timezone.utc)
+
+
+def make_message(id, timestamp, session_id="s1"):
+    return {
+        "_id": f"oid-{id}", "id": id, "session_id": session_id, "message": "hi",
+        "response": "hello", "model_provider": "openai", "model_name": "gpt-5",
+        "timestamp": timestamp, "is_safe": True
+    }
+
+
+# Three messages share each of the first two timestamps (BSON dates are only
+# millisecond-precise); ids are not in insertion order
+MESSAGES = [
+    make_message("c", T0), make_message("a", T0), make_message("b", T0),
+    make_message("f", T0 + timedelta(milliseconds=1)),
+    make_message("d", T0 + timedelta(milliseconds=1)),
+    make_message("e", T0 + timedelta(milliseconds=1)),
+    make_message("g", T0 + timedelta(seconds=1)),
+    make_message("x", T0, session_id="s2"),
+]
+EXPECTED_IDS = ["a", "b", "c", "d", "e", "f", "g"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "db", SimpleNamespace(chat_messages=FakeCollection(list(MESSAGES))))
+    return TestClient(server.app)
+
+
+def fetch_all_pages(client, limit):
+    ids = []
+    pages = 0
+    params = {"limit": limit}
+    while True:
+        response = client.get("/api/chat/messages/s1", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        ids.extend(item["id"] for item in page["items"])
+        pages += 1
+        if page["next"] is None:
+            return ids, pages
+        params = {"limit": limit, **page["next"]}
+
+
+@pytest.mark.parametrize("limit, expected_pages", [(1, 8), (2, 4), (3, 3), (7, 2), (1000, 1)])
+def test_pages_through_equal_timestamps_without_skips_or_repeats(client, limit, expected_pages):
+    ids, pages = fetch_all_pages(client, limit)
+    assert ids == EXPECTED_IDS
+    assert pages == expected_pages
+
+
+def test_next_points_after_the_last_item(client):
+    page = client.get("/api/chat/messages/s1", params={"limit": 2}).json()
+    assert [item["id"] for item in page["items"]] == ["a", "b"]
+    assert "_id" not in page["items"][0]
+    assert page["next"] == {"after": "2026-01-01T12:00:00.123000Z", "after_id": "b"}
+
+
+def test_last_page_has_no_next(client):
+    page = client.get("/api/chat/messages/s1", params={"limit": 3, "after": "2026-01-01T12:00:00.124Z", "after_id": "e"}).json()
+    assert [item["id"] for item in page["items"]] == ["f", "g"]
+    assert page["next"] is None
+
+
+def test_after_without_id_skips_the_whole_timestamp(client):
+    page = client.get("/api/chat/messages/s1", params={"after": "2026-01-01T12:00:00.123Z"}).json()
+    assert [item["id"] for item in page["items"]] == ["d", "e", "f", "g"]
+    assert page["next"] is None
+
+
+@pytest.mark.parametrize("limit, status_code", [(0, 422), (1, 200), (1000, 200), (1001, 422)])
+def test_limit_bounds(client, limit, status_code):
+    response = client.get("/api/chat/messages/s1", params={"limit": limit})
+    assert response.status_code == status_code
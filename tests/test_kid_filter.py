@@ -0,0 +1,74 @@
+import pytest
+
+import server
+
+
+@pytest.fixture(params=["automaton", "regex"])
+def kid_filter(request, monkeypatch):
+    """Run each test on the Aho-Corasick path and on the regex fallback"""
+    if request.param == "automaton" and server._KIDS_AC is None:
+        pytest.skip("pyahocorasick is not installed")
+    if request.param == "regex":
+        monkeypatch.setattr(server, "_KIDS_AC", None)
+    return server
+
+
+def baseline_filter(message, response):
+    """The original two-step behaviour: rewrite, then check the rewritten text"""
+    kid_friendly_response = server.make_kid_friendly(response)
+    combined_text = (message + " " + kid_friendly_response).lower()
+    is_safe = not any(keyword in combined_text for keyword in server.UNSAFE_KEYWORDS)
+    return kid_friendly_response, is_safe
+
+
+@pytest.mark.parametrize("response, expected", [
+    ("Artificial Intelligence can Generate art", "AI (like a smart computer) can create art"),
+    ("MACHINE LEARNING and Neural Networks", "how computers learn and computer brains"),
+    # 'algorithm' and 'machine learning' overlap on the 'm'; the leftmost wins
+    ("algorithmachine learning", "computer instructionsachine learning"),
+    ("implementation", "make it workation"),
+    ("Le réseau 🤖 Neural Network analyse", "Le réseau 🤖 computer brain analyse"),
+    ("İ processing é Sophisticated", "İ thinking é smart"),
+    # Non-ASCII letters that lowercase to (or fold with) ASCII ones never
+    # complete a word, on either path
+    ("proceſſing an ALGORİTHM", "proceſſing an ALGORİTHM"),
+    ("algorıthm to ımplement", "algorıthm to ımplement"),
+    ("neural networ\u212a", "neural networ\u212a"),
+])
+def test_rewrites_complex_words(kid_filter, response, expected):
+    assert kid_filter.filter_for_kids("hi", response) == (expected, True)
+    assert kid_filter.make_kid_friendly(response) == expected
+
+
+@pytest.mark.parametrize("message, response", [
+    ("Tell me about WAR", "Computers are fun"),
+    ("What is AI?", "Some robots are Scary"),
+    ("What is AI?", "the algorithm is mean"),
+    ("¿Qué es la VIOLENCE?", "🤖"),
+    # U+212A KELVIN SIGN lowercases to 'k'
+    ("hi", "\u212aILL"),
+    ("\u212aill the dragon", "Computers are fun"),
+])
+def test_flags_unsafe_text_in_message_or_response(kid_filter, message, response):
+    assert kid_filter.filter_for_kids(message, response) == (response, False)
+    assert kid_filter.is_content_safe_for_kids(message, response) is False
+
+
+@pytest.mark.parametrize("message, response", [
+    ("hi", "Artificial Intelligence can Generate art"),
+    ("hi", "algorithmachine learning"),
+    ("hi", "implementation"),
+    ("Explain machine learning", "We analyze data to implement a sophisticated algorithm 🤖"),
+    ("Tell me about war", "An algorithm"),
+    ("What is AI?", "Mean-spirited processing"),
+    ("héllo", "Le réseau 🤖 Neural Network"),
+    ("hi", "\u212aILL the algorithm"),
+])
+def test_matches_rewrite_then_check(kid_filter, message, response):
+    # Scanning the original response must give the same verdict as the old
+    # check on the rewritten response
+    kid_friendly_response, is_safe = kid_filter.filter_for_kids(message, response)
+    expected_response, expected_safe = baseline_filter(message, response)
+    assert is_safe == expected_safe
+    if is_safe:
+        assert kid_friendly_response == expected_response
@@ -0,0 +1,139 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import (
+    AutoReconnect, BulkWriteError, DocumentTooLarge, DuplicateKeyError, ServerSelectionTimeoutError
+)
+
+import server
+
+
+class FakeStatusChecks:
+    """Stores checks by id; insert_many raises `insert_many_error` if set and
+    insert_one raises whatever `insert_one_errors` maps the check's id to"""
+    def __init__(self):
+        self.stored = {}
+        self.insert_many_error = None
+        self.insert_one_errors = {}
+
+    async def insert_many(self, docs, ordered=True):
+        if self.insert_many_error is not None:
+            raise self.insert_many_error
+        for doc in docs:
+            self.stored[doc["id"]] = doc
+
+    async def insert_one(self, doc):
+        error = self.insert_one_errors.get(doc["id"])
+        if error is not None:
+            raise error
+        self.stored[doc["id"]] = doc
+
+
+@pytest.fixture
+def status_checks(monkeypatch):
+    collection = FakeStatusChecks()
+    monkeypatch.setattr(server, "db", SimpleNamespace(status_checks=collection))
+    monkeypatch.setattr(server, "_STATUS_BUFFER", [])
+    return collection
+
+
+def buffer_checks(*ids):
+    checks = [{"id": id, "client_name": "test"} for id in ids]
+    server._STATUS_BUFFER.extend(checks)
+    return checks
+
+
+def test_flush_writes_buffered_checks(status_checks):
+    buffer_checks("a", "b")
+    asyncio.run(server.flush_status_buffer())
+    assert list(status_checks.stored) == ["a", "b"]
+    assert server._STATUS_BUFFER == []
+
+
+@pytest.mark.parametrize("error", [ServerSelectionTimeoutError("no servers"), AutoReconnect("connection reset")])
+def test_connection_failure_puts_checks_back(status_checks, error):
+    checks = buffer_checks("a", "b")
+    status_checks.insert_many_error = error
+    asyncio.run(server.flush_status_buffer())
+    assert server._STATUS_BUFFER == checks
+
+    status_checks.insert_many_error = None
+    asyncio.run(server.flush_status_buffer())
+    assert list(status_checks.stored) == ["a", "b"]
+    assert server._STATUS_BUFFER == []
+
+
+def test_duplicates_count_as_written_and_rejected_checks_are_dropped(status_checks):
+    buffer_checks("a", "b", "c")
+    status_checks.insert_many_error = BulkWriteError({
+        "writeErrors": [
+            {"index": 0, "code": server.DUPLICATE_KEY_ERROR_CODE, "errmsg": "duplicate key"},
+            {"index": 2, "code": 2, "errmsg": "bad value"},
+        ],
+        "writeConcernErrors": [],
+    })
+    asyncio.run(server.flush_status_buffer())
+    assert server._STATUS_BUFFER == []
+
+
+def test_write_concern_error_retries_the_checks_that_were_written(status_checks):
+    checks = buffer_checks("a", "b", "c")
+    status_checks.insert_many_error = BulkWriteError({
+        "writeErrors": [{"index": 1, "code": 2, "errmsg": "bad value"}],
+        "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}],
+    })
+    asyncio.run(server.flush_status_buffer())
+    assert server._STATUS_BUFFER == [checks[0], checks[2]]
+
+
+def test_bad_check_does_not_block_the_others(status_checks):
+    # insert_many fails as a whole, so each check is written on its own
+    checks = buffer_checks("good", "too-large", "duplicate", "unreachable")
+    status_checks.insert_many_error = DocumentTooLarge("document too large")
+    status_checks.insert_one_errors = {
+        "too-large": DocumentTooLarge("document too large"),
+        "duplicate": DuplicateKeyError("duplicate key", code=server.DUPLICATE_KEY_ERROR_CODE),
+        "unreachable": AutoReconnect("connection reset"),
+    }
+    asyncio.run(server.flush_status_buffer())
+    assert list(status_checks.stored) == ["good"]
+    assert server._STATUS_BUFFER == [checks[3]]
+
+    status_checks.insert_many_error = None
+    asyncio.run(server.flush_status_buffer())
+    assert list(status_checks.stored) == ["good", "unreachable"]
+    assert server._STATUS_BUFFER == []
+
+
+def test_full_buffer_writes_directly(status_checks, monkeypatch):
+    monkeypatch.setattr(server, "STATUS_BUFFER_MAX_SIZE", 2)
+    checks = buffer_checks("a", "b")
+    status_check = asyncio.run(server.create_status_check(server.StatusCheckCreate(client_name="direct")))
+    assert list(status_checks.stored) == [status_check.id]
+    assert server._STATUS_BUFFER == checks
+
+
+def test_full_buffer_fails_when_the_direct_write_does(status_checks, monkeypatch):
+    monkeypatch.setattr(server, "STATUS_BUFFER_MAX_SIZE", 0)
+
+    async def insert_one(doc):
+        raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(status_checks, "insert_one", insert_one)
+    with pytest.raises(ServerSelectionTimeoutError):
+        asyncio.run(server.create_status_check(server.StatusCheckCreate(client_name="direct")))
+
+
+def test_shutdown_flushes_remaining_checks(status_checks, monkeypatch):
+    closed = []
+
+    async def close():
+        closed.append(True)
+
+    monkeypatch.setattr(server, "client", SimpleNamespace(close=close))
+    buffer_checks("a", "b")
+    asyncio.run(server.shutdown_db_client())
+    assert list(status_checks.stored) == ["a", "b"]
+    assert server._STATUS_BUFFER == []
+    assert closed == [True]